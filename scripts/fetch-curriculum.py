@@ -2,6 +2,7 @@
 
 import json
 import os
+import shutil
 import sys
 import urllib.request
 
@@ -9,6 +10,9 @@ import urllib.request
 BASE_URL = "https://deloittedevelopment.udemy.com/api-2.0"
 COURSE_ID = 4267614
 
+# Seconds before a stalled connect or read is abandoned
+REQUEST_TIMEOUT = 30.0
+
 # Category mapping for CUDA course sections
 SECTION_CATEGORIES = {
     1: "gpu-hardware",
@@ -36,27 +40,61 @@ def get_token() -> str:
     return token
 
 
-def fetch_curriculum(token: str) -> dict:
-    """Fetch curriculum data from Udemy Business API."""
+def fetch_curriculum(token: str, path: str) -> dict:
+    """Fetch curriculum data from Udemy Business API.
+
+    The raw response body is streamed to disk and parsed back from there
+    instead of being held in memory and re-serialized; path is replaced
+    only once the download parses.
+    """
     url = (
         f"{BASE_URL}/courses/{COURSE_ID}/cached-subscriber-curriculum-items/"
         f"?page_size=300&fields[lecture]=title,asset,object_index"
         f"&fields[chapter]=title,object_index"
-        f"&fields[asset]=title,asset_type,length"
+        f"&fields[asset]=title,asset_type,length,captions"
     )
 
     req = urllib.request.Request(url)
     req.add_header("Authorization", f"Bearer {token}")
     req.add_header("Accept", "application/json")
 
-    with urllib.request.urlopen(req) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    # Download to a temporary file and only move it into place once it
+    # parses, so a failed or truncated fetch keeps the previous copy
+    tmp_path = f"{path}.tmp"
+    try:
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(resp, f)
+
+        with open(tmp_path, "rb") as f:
+            data = json.load(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return data
+
+
+def select_caption_url(captions: list) -> str | None:
+    """Pick the VTT URL from a lecture's captions, preferring English."""
+    for caption in captions:
+        if caption.get("locale_id") == "en_US" or caption.get("video_label") == "English":
+            return caption.get("url")
 
+    # Fallback to first available caption
+    if captions:
+        return captions[0].get("url")
 
-def parse_curriculum(data: dict) -> tuple[list, list]:
-    """Parse curriculum data into all_items and video_lectures lists."""
+    return None
+
+
+def parse_curriculum(data: dict) -> tuple[list, list, dict]:
+    """Parse curriculum data into all_items, video_lectures and vtt_urls."""
     all_items = []
     video_lectures = []
+    vtt_urls = {}
 
     current_section = 0
     lecture_in_section = 0
@@ -97,6 +135,10 @@ def parse_curriculum(data: dict) -> tuple[list, list]:
                     "title": item.get("title", ""),
                 })
 
+                vtt_url = select_caption_url(asset.get("captions") or [])
+                if vtt_url:
+                    vtt_urls[str(item["id"])] = vtt_url
+
         if item_class == "quiz":
             lecture_in_section += 1
             category = SECTION_CATEGORIES.get(current_section, "gpu-hardware")
@@ -112,32 +154,33 @@ def parse_curriculum(data: dict) -> tuple[list, list]:
             }
             all_items.append(entry)
 
-    return all_items, video_lectures
+    return all_items, video_lectures, vtt_urls
 
 
 def main():
     token = get_token()
 
     print("Fetching curriculum...")
-    curriculum = fetch_curriculum(token)
-
-    # Save raw curriculum
     os.makedirs("data", exist_ok=True)
-    with open("data/curriculum.json", "w") as f:
-        json.dump(curriculum, f, indent=2, ensure_ascii=False)
+    curriculum = fetch_curriculum(token, "data/curriculum.json")
     print(f"Saved curriculum.json ({curriculum.get('count', 0)} items)")
 
-    # Parse into structured data
-    all_items, video_lectures = parse_curriculum(curriculum)
+    # Parse into structured data (machine-read only, so written compactly)
+    all_items, video_lectures, vtt_urls = parse_curriculum(curriculum)
 
     with open("data/all_items.json", "w") as f:
-        json.dump(all_items, f, indent=2, ensure_ascii=False)
+        json.dump(all_items, f, separators=(",", ":"), ensure_ascii=False)
     print(f"Saved all_items.json ({len(all_items)} items)")
 
     with open("data/video_lectures.json", "w") as f:
-        json.dump(video_lectures, f, indent=2, ensure_ascii=False)
+        json.dump(video_lectures, f, separators=(",", ":"), ensure_ascii=False)
     print(f"Saved video_lectures.json ({len(video_lectures)} video lectures)")
 
+    # Captions come back with the curriculum; fetch-vtt-urls.py fills any gaps
+    with open("data/vtt_urls.json", "w") as f:
+        json.dump(vtt_urls, f, separators=(",", ":"))
+    print(f"Saved vtt_urls.json ({len(vtt_urls)} VTT URLs)")
+
     # Print summary
     sections = {}
     for item in all_items:
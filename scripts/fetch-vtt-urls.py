@@ -1,14 +1,44 @@
-"""Fetch VTT subtitle URLs for all video lectures from Udemy Business API."""
+"""Fetch VTT subtitle URLs for video lectures from Udemy Business API.
 
+fetch-curriculum.py already collects most URLs from the curriculum response;
+this script only queries lectures still missing from data/vtt_urls.json.
+
+Caption URLs are signed and expire. To refresh every URL, rerun
+fetch-curriculum.py or run this script with --refresh.
+"""
+
+import http.client
 import json
 import os
+import random
 import sys
+import threading
 import time
-import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 
-BASE_URL = "https://deloittedevelopment.udemy.com/api-2.0"
+API_HOST = "deloittedevelopment.udemy.com"
+BASE_PATH = "/api-2.0"
 COURSE_ID = 4267614
 
+# Seconds before a stalled connect or read is abandoned
+REQUEST_TIMEOUT = 30.0
+
+# Concurrency and rate limiting
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 3.0
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+
+# Adaptive rate: halve on 429, then recover additively per successful request
+MIN_REQUESTS_PER_SECOND = 0.5
+RATE_DECREASE = 0.5
+RATE_INCREASE = 0.1
+
+# One keep-alive connection per worker thread
+_local = threading.local()
+
 
 def get_token() -> str:
     """Get Udemy Business API token from environment."""
@@ -20,36 +50,136 @@ def get_token() -> str:
     return token
 
 
-def fetch_lecture_captions(token: str, lecture_id: int) -> str | None:
+class RateLimiter:
+    """Space out request starts under an adaptive requests-per-second cap.
+
+    The rate is cut multiplicatively when the server throttles and raised
+    additively on success, up to the initial rate.
+    """
+
+    def __init__(self, rate: float, min_rate: float = MIN_REQUESTS_PER_SECOND):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self) -> None:
+        """Block until the caller may issue the next request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+        time.sleep(slot - now)
+
+    def on_success(self) -> None:
+        """Recover the rate after a successful request."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, delay: float) -> None:
+        """Slow down and hold every worker for delay seconds after a 429."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+            self._next_slot = max(self._next_slot, time.monotonic() + delay)
+
+
+def retry_delay(error: urllib.error.HTTPError, attempt: int) -> float:
+    """Seconds to wait before retrying, honoring rate-limit response headers."""
+    retry_after = error.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    # X-RateLimit-Reset is either an epoch timestamp or seconds until reset
+    reset = error.headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            value = float(reset)
+            return max(0.0, value - time.time() if value > 1e9 else value)
+        except ValueError:
+            pass
+
+    # Exponential backoff with jitter so workers don't retry in lockstep
+    return BACKOFF_BASE * 2 ** attempt + random.uniform(0, BACKOFF_BASE)
+
+
+def get_connection() -> http.client.HTTPSConnection:
+    """Return this thread's persistent connection to the API host."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = http.client.HTTPSConnection(API_HOST, timeout=REQUEST_TIMEOUT)
+        _local.conn = conn
+    return conn
+
+
+def api_get(token: str, path: str) -> dict:
+    """GET a JSON resource, reusing the thread's connection across calls."""
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json",
+    }
+    conn = get_connection()
+    try:
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+    except (http.client.HTTPException, OSError):
+        # The server may drop idle keep-alive connections; reconnect once
+        conn.close()
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+
+    if resp.status >= 400:
+        url = f"https://{API_HOST}{path}"
+        raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+    return json.loads(body.decode("utf-8"))
+
+
+def select_caption_url(captions: list) -> str | None:
+    """Pick the VTT URL from a lecture's captions, preferring English."""
+    for caption in captions:
+        if caption.get("locale_id") == "en_US" or caption.get("video_label") == "English":
+            return caption.get("url")
+
+    # Fallback to first available caption
+    if captions:
+        return captions[0].get("url")
+
+    return None
+
+
+def fetch_lecture_captions(token: str, lecture_id: int, limiter: RateLimiter) -> str | None:
     """Fetch VTT URL for a specific lecture."""
-    url = (
-        f"{BASE_URL}/users/me/subscribed-courses/{COURSE_ID}"
+    path = (
+        f"{BASE_PATH}/users/me/subscribed-courses/{COURSE_ID}"
         f"/lectures/{lecture_id}/"
         f"?fields[lecture]=asset"
         f"&fields[asset]=captions,title"
     )
 
-    req = urllib.request.Request(url)
-    req.add_header("Authorization", f"Bearer {token}")
-    req.add_header("Accept", "application/json")
-
     try:
-        with urllib.request.urlopen(req) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                data = api_get(token, path)
+                limiter.on_success()
+                break
+            except urllib.error.HTTPError as e:
+                # Back off and retry only when rate limited
+                if e.code != 429 or attempt == MAX_RETRIES:
+                    raise
+                limiter.on_throttle(retry_delay(e, attempt))
 
         asset = data.get("asset", {})
-        captions = asset.get("captions", [])
-
-        # Prefer English captions
-        for caption in captions:
-            if caption.get("locale_id") == "en_US" or caption.get("video_label") == "English":
-                return caption.get("url")
-
-        # Fallback to first available caption
-        if captions:
-            return captions[0].get("url")
-
-        return None
+        return select_caption_url(asset.get("captions") or [])
 
     except Exception as e:
         print(f"  Error fetching lecture {lecture_id}: {e}")
@@ -63,31 +193,41 @@ def main():
     with open("data/video_lectures.json") as f:
         videos = json.load(f)
 
-    print(f"Fetching VTT URLs for {len(videos)} lectures...")
+    # Keep URLs already collected by fetch-curriculum.py unless --refresh
+    # is given, which refetches every lecture to renew expired signed URLs
+    refresh = "--refresh" in sys.argv[1:]
     vtt_urls = {}
-    errors = []
+    if not refresh and os.path.exists("data/vtt_urls.json"):
+        with open("data/vtt_urls.json") as f:
+            vtt_urls = json.load(f)
 
-    for i, video in enumerate(videos):
-        lecture_id = video["id"]
-        s = video["s"]
-        l_num = video["l"]
+    pending = [video for video in videos if str(video["id"]) not in vtt_urls]
+    print(f"Fetching VTT URLs for {len(pending)} lectures ({len(vtt_urls)} already known)...")
+    errors = []
 
-        vtt_url = fetch_lecture_captions(token, lecture_id)
+    limiter = RateLimiter(REQUESTS_PER_SECOND)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(
+            lambda video: fetch_lecture_captions(token, video["id"], limiter),
+            pending,
+        )
 
-        if vtt_url:
-            vtt_urls[str(lecture_id)] = vtt_url
-        else:
-            errors.append(f"S{s}-L{l_num} ({lecture_id}): No captions")
+        for i, (video, vtt_url) in enumerate(zip(pending, results)):
+            lecture_id = video["id"]
+            s = video["s"]
+            l_num = video["l"]
 
-        if (i + 1) % 5 == 0:
-            print(f"  Progress: {i + 1}/{len(videos)}")
+            if vtt_url:
+                vtt_urls[str(lecture_id)] = vtt_url
+            else:
+                errors.append(f"S{s}-L{l_num} ({lecture_id}): No captions")
 
-        # Rate limiting
-        time.sleep(0.3)
+            if (i + 1) % 5 == 0:
+                print(f"  Progress: {i + 1}/{len(pending)}")
 
     # Save VTT URLs
     with open("data/vtt_urls.json", "w") as f:
-        json.dump(vtt_urls, f, indent=2)
+        json.dump(vtt_urls, f, separators=(",", ":"))
 
     print(f"\nDone: {len(vtt_urls)} VTT URLs saved, {len(errors)} errors")
     if errors:
@@ -5,16 +5,42 @@ subgraph names, and arrow labels with double quotes.
 """
 
 import glob
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Content hashes of files already processed, so unchanged files are skipped.
+# Bump CACHE_VERSION whenever the fixing rules change to force a full pass.
+CACHE_PATH = 'data/.mermaid-cache.json'
+CACHE_VERSION = 1
+
+# Japanese characters (Hiragana, Katakana, CJK)
+_JP_RE = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+# Special characters that cause issues
+_SPECIAL_CHARS = frozenset(':=/+*?（）→←×✓<>')
+_BRACKET_RE = re.compile(r'(\w+)\[([^\]"]*?)\](?!\()')
+_BRACE_RE = re.compile(r'(\w+)\{([^}"]*?)\}')
+_ARROW_RE = re.compile(r'\|([^|"]+?)\|')
+_SUBGRAPH_RE = re.compile(r'^(\s*subgraph\s+)(?!")(.*?)$')
+_SUBGRAPH_ID_RE = re.compile(r'\w+\[')
+_MERMAID_BLOCK_RE = re.compile(r'(```mermaid\n)(.*?)(```)', re.DOTALL)
+
+# Lines passed through unchanged: diagram type declarations and block ends
+_SKIP_LINES = frozenset((
+    'graph TD', 'graph LR', 'graph TB',
+    'flowchart TD', 'flowchart LR', 'flowchart TB',
+    'sequenceDiagram', 'classDiagram', 'end',
+))
 
 
 def needs_quoting(text: str) -> bool:
     """Check if text contains characters that need quoting in mermaid."""
-    # Japanese characters (Hiragana, Katakana, CJK)
-    if re.search(r'[\u3000-\u9fff\uff00-\uffef]', text):
+    # ASCII-only text cannot contain Japanese characters, so skip the regex
+    if not text.isascii() and _JP_RE.search(text):
         return True
-    # Special characters that cause issues
-    if any(c in text for c in [':', '=', '/', '+', '*', '?', '（', '）', '→', '←', '×', '✓', '<', '>']):
+    if not _SPECIAL_CHARS.isdisjoint(text):
         return True
     return False
 
@@ -40,15 +66,13 @@ def fix_node_labels(line: str) -> str:
         return match.group(0)
 
     # Fix [...] labels (but not [...|...|...] which is arrow label syntax)
-    line = re.sub(
-        r'(\w+)\[([^\]"]*?)\](?!\()',
+    line = _BRACKET_RE.sub(
         lambda m: fix_bracket_simple(m, '[', ']'),
         line
     )
 
     # Fix {...} labels (diamond nodes)
-    line = re.sub(
-        r'(\w+)\{([^}"]*?)\}',
+    line = _BRACE_RE.sub(
         lambda m: fix_bracket_simple(m, '{', '}'),
         line
     )
@@ -74,12 +98,12 @@ def fix_bracket_simple(match, open_br, close_br):
 def fix_subgraph(line: str) -> str:
     """Fix unquoted subgraph names."""
     # Match: subgraph name (not already quoted)
-    m = re.match(r'^(\s*subgraph\s+)(?!")(.*?)$', line)
+    m = _SUBGRAPH_RE.match(line)
     if m and needs_quoting(m.group(2).strip()):
         prefix = m.group(1)
         name = m.group(2).strip()
         # Skip if it has an ID like: subgraph ID["label"]
-        if re.match(r'\w+\[', name):
+        if _SUBGRAPH_ID_RE.match(name):
             return line
         escaped = name.replace('"', "'")
         return f'{prefix}"{escaped}"'
@@ -98,7 +122,7 @@ def fix_arrow_labels(line: str) -> str:
             return f'|"{escaped}"|'
         return match.group(0)
 
-    line = re.sub(r'\|([^|"]+?)\|', fix_label, line)
+    line = _ARROW_RE.sub(fix_label, line)
     return line
 
 
@@ -111,9 +135,7 @@ def fix_mermaid_block(block: str) -> str:
         stripped = line.strip()
 
         # Skip empty lines and mermaid type declaration
-        if not stripped or stripped in ('graph TD', 'graph LR', 'graph TB',
-                                        'flowchart TD', 'flowchart LR', 'flowchart TB',
-                                        'sequenceDiagram', 'classDiagram', 'end'):
+        if not stripped or stripped in _SKIP_LINES:
             fixed_lines.append(line)
             continue
 
@@ -137,50 +159,85 @@ def fix_mermaid_block(block: str) -> str:
     return '\n'.join(fixed_lines)
 
 
-def process_file(filepath: str) -> bool:
-    """Process a single MDX file and fix mermaid blocks."""
+def content_hash(content: str) -> str:
+    """Return the cache hash of file content."""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def load_cache() -> dict:
+    """Load the file hash cache, discarding it if written by another version."""
+    try:
+        with open(CACHE_PATH, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('files', {})
+
+
+def save_cache(files: dict) -> None:
+    """Persist the file hash cache atomically."""
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = f'{CACHE_PATH}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'files': files}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def process_file(filepath: str, cached_hash: str | None = None) -> tuple[bool, str]:
+    """Process a single MDX file and fix mermaid blocks.
+
+    Returns whether the file was modified and the hash of its final content.
+    Files whose hash matches cached_hash are left untouched.
+    """
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # Find all mermaid blocks
-    pattern = r'(```mermaid\n)(.*?)(```)'
-    matches = list(re.finditer(pattern, content, re.DOTALL))
-
-    if not matches:
-        return False
+    digest = content_hash(content)
+    if digest == cached_hash:
+        return False, digest
 
-    modified = False
-    new_content = content
+    # Cheap substring probe before running the regex engine
+    if '```mermaid' not in content:
+        return False, digest
 
-    # Process in reverse order to preserve positions
-    for match in reversed(matches):
-        block = match.group(2)
-        fixed = fix_mermaid_block(block)
-        if fixed != block:
-            new_content = (
-                new_content[:match.start(2)]
-                + fixed
-                + new_content[match.end(2):]
-            )
-            modified = True
+    # Fix all mermaid blocks in a single forward pass
+    new_content, count = _MERMAID_BLOCK_RE.subn(
+        lambda m: m.group(1) + fix_mermaid_block(m.group(2)) + m.group(3),
+        content
+    )
+    modified = count > 0 and new_content != content
 
     if modified:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(new_content)
+        digest = content_hash(new_content)
 
-    return modified
+    return modified, digest
 
 
 def main():
     files = sorted(glob.glob('src/data/sections/**/*.mdx', recursive=True))
     fixed_count = 0
 
-    for filepath in files:
-        if process_file(filepath):
-            fixed_count += 1
-            print(f'Fixed: {filepath}')
+    cache = load_cache()
+    cached_hashes = [cache.get(filepath) for filepath in files]
+    new_cache = {}
+
+    # Files are independent and CPU-bound, so fan them out across cores
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(process_file, files, cached_hashes, chunksize=8)
+        for filepath, (modified, digest) in zip(files, results):
+            new_cache[filepath] = digest
+            if modified:
+                fixed_count += 1
+                print(f'Fixed: {filepath}')
+
+    save_cache(new_cache)
 
-    print(f'\nTotal files fixed: {fixed_count}/{len(files)}')
+    skipped = sum(1 for filepath in files if cache.get(filepath) == new_cache[filepath])
+    print(f'\nTotal files fixed: {fixed_count}/{len(files)} ({skipped} unchanged since last run)')
 
 
 if __name__ == '__main__':
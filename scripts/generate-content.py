@@ -1,56 +1,43 @@
 """Generate Japanese MDX content from English transcripts using Claude API."""
 
+import hashlib
 import json
 import os
 import sys
+import tempfile
+import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 ANTHROPIC_API_URL = "https://api.anthropic.com/v1/messages"
-
-SECTION_TITLES = {
-    1: "Introduction to the Nvidia GPUs hardware",
-    2: "Installing CUDA and other programs",
-    3: "Introduction to CUDA programming",
-    4: "Profiling",
-    5: "Performance analysis for the previous applications",
-    6: "2D Indexing",
-    7: "Shared Memory + Warp Divergence",
-    8: "Debugging tools",
-    9: "Vector Reduction",
-    10: "Roofline model",
-    11: "Matrix Multiplication (Bonus)",
-    12: "Profiling - nsight systems",
-}
-
-SECTION_CATEGORIES = {
-    1: "gpu-hardware",
-    2: "setup",
-    3: "cuda-basics",
-    4: "profiling",
-    5: "performance",
-    6: "indexing",
-    7: "memory-optimization",
-    8: "debugging",
-    9: "algorithms",
-    10: "performance",
-    11: "algorithms",
-    12: "profiling",
-}
-
-SECTION_DIFFICULTY = {
-    1: "beginner",
-    2: "beginner",
-    3: "beginner",
-    4: "intermediate",
-    5: "intermediate",
-    6: "intermediate",
-    7: "advanced",
-    8: "intermediate",
-    9: "advanced",
-    10: "advanced",
-    11: "advanced",
-    12: "intermediate",
-}
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Generated responses are cached on disk, keyed by prompt, input and model
+CACHE_DIR = "data/cache/claude"
+
+# Concurrent requests and retry policy for rate limits (429) and overload (529)
+MAX_WORKERS = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0
+RETRY_STATUSES = (429, 529)
+
+# Section metadata indexed by section number: (title, category, difficulty)
+SECTION_META = [
+    None,
+    ("Introduction to the Nvidia GPUs hardware", "gpu-hardware", "beginner"),
+    ("Installing CUDA and other programs", "setup", "beginner"),
+    ("Introduction to CUDA programming", "cuda-basics", "beginner"),
+    ("Profiling", "profiling", "intermediate"),
+    ("Performance analysis for the previous applications", "performance", "intermediate"),
+    ("2D Indexing", "indexing", "intermediate"),
+    ("Shared Memory + Warp Divergence", "memory-optimization", "advanced"),
+    ("Debugging tools", "debugging", "intermediate"),
+    ("Vector Reduction", "algorithms", "advanced"),
+    ("Roofline model", "performance", "advanced"),
+    ("Matrix Multiplication (Bonus)", "algorithms", "advanced"),
+    ("Profiling - nsight systems", "profiling", "intermediate"),
+]
 
 
 def get_api_key() -> str:
@@ -79,9 +66,57 @@ SYSTEM_PROMPT = """あなたはCUDAプログラミングの専門家です．英
 - 各セクションは充実した内容にする（全体で800-1500文字程度）
 - トランスクリプトの内容を忠実に反映しつつ，構造化された解説にする"""
 
-
-def generate_mdx_content(api_key: str, transcript: str, title: str, section_title: str) -> str:
-    """Generate Japanese MDX content from transcript using Claude API."""
+# Bump to invalidate cached responses when generation settings change
+PROMPT_VERSION = 1
+
+
+def cache_key(user_message: str) -> str:
+    """Return the cache key for a generation request."""
+    source = f"{PROMPT_VERSION}\0{SYSTEM_PROMPT}\0{user_message}\0{MODEL}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def read_cache(key: str) -> str | None:
+    """Return the cached response for key, or None on a miss."""
+    try:
+        with open(os.path.join(CACHE_DIR, f"{key}.txt"), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Write text to path via a temporary file and rename."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_cache(key: str, text: str) -> None:
+    """Store a response and its metadata sidecar in the cache."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta = {
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    write_atomic(os.path.join(CACHE_DIR, f"{key}.meta.json"), json.dumps(meta, indent=2))
+    write_atomic(os.path.join(CACHE_DIR, f"{key}.txt"), text)
+
+
+def generate_mdx_content(
+    api_key: str, transcript: str, title: str, section_title: str, use_cache: bool = True
+) -> str:
+    """Generate Japanese MDX content from transcript using Claude API.
+
+    With use_cache=False the cached response is ignored, but the fresh
+    response still replaces the cache entry.
+    """
     user_message = f"""以下のUdemyレクチャーのトランスクリプトを基に，日本語の技術解説MDXコンテンツを生成してください．
 
 レクチャータイトル: {title}
@@ -90,8 +125,14 @@ def generate_mdx_content(api_key: str, transcript: str, title: str, section_titl
 トランスクリプト:
 {transcript}"""
 
+    key = cache_key(user_message)
+    if use_cache:
+        cached = read_cache(key)
+        if cached is not None:
+            return cached
+
     payload = json.dumps({
-        "model": "claude-sonnet-4-5-20250929",
+        "model": MODEL,
         "max_tokens": 4096,
         "system": SYSTEM_PROMPT,
         "messages": [{"role": "user", "content": user_message}],
@@ -106,12 +147,26 @@ def generate_mdx_content(api_key: str, transcript: str, title: str, section_titl
     req.add_header("anthropic-version", "2023-06-01")
     req.add_header("content-type", "application/json")
 
-    with urllib.request.urlopen(req) as resp:
-        result = json.loads(resp.read().decode("utf-8"))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with urllib.request.urlopen(req) as resp:
+                result = json.loads(resp.read().decode("utf-8"))
+            break
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                raise
+            retry_after = e.headers.get("retry-after")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = BACKOFF_BASE * 2 ** attempt
+            time.sleep(delay)
 
     content = result.get("content", [])
     if content and content[0].get("type") == "text":
-        return content[0]["text"]
+        text = content[0]["text"]
+        write_cache(key, text)
+        return text
 
     return ""
 
@@ -121,9 +176,7 @@ def build_frontmatter(video: dict) -> str:
     s = video["s"]
     l_num = video["l"]
     title = video["title"]
-    section_title = SECTION_TITLES[s]
-    category = SECTION_CATEGORIES[s]
-    difficulty = SECTION_DIFFICULTY[s]
+    section_title, category, difficulty = SECTION_META[s]
     order = s * 100 + l_num
 
     ja_title = f"S{s}-L{l_num}: {title}"
@@ -143,32 +196,51 @@ order: {order}
 ---'''
 
 
+def generate_lecture(api_key: str, video: dict, transcript: str, use_cache: bool) -> None:
+    """Generate and write the MDX file for a single lecture."""
+    s = video["s"]
+    l_num = video["l"]
+    output_path = f"src/data/sections/{s:02d}/lecture-{l_num:02d}.mdx"
+
+    section_title = SECTION_META[s][0]
+    content = generate_mdx_content(api_key, transcript, video["title"], section_title, use_cache)
+    frontmatter = build_frontmatter(video)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        f.write(frontmatter + "\n\n" + content + "\n")
+
+
 def main():
     api_key = get_api_key()
 
     with open("data/video_lectures.json") as f:
         videos = json.load(f)
 
+    # --no-cache ignores cached responses but still stores the new ones
+    args = sys.argv[1:]
+    use_cache = "--no-cache" not in args
+    args = [arg for arg in args if arg != "--no-cache"]
+
     # Filter to specific sections if argument provided
     target_sections = None
-    if len(sys.argv) > 1:
-        target_sections = [int(x) for x in sys.argv[1].split(",")]
+    if args:
+        target_sections = [int(x) for x in args[0].split(",")]
         print(f"Processing sections: {target_sections}")
 
     success = 0
     errors = []
+    jobs = []
 
     for video in videos:
         s = video["s"]
         l_num = video["l"]
-        title = video["title"]
 
         if target_sections and s not in target_sections:
             continue
 
         lecture_id = video["id"]
         transcript_path = f"data/transcripts/{lecture_id}.txt"
-        output_path = f"src/data/sections/{s:02d}/lecture-{l_num:02d}.mdx"
 
         if not os.path.exists(transcript_path):
             errors.append(f"S{s}-L{l_num}: No transcript at {transcript_path}")
@@ -181,23 +253,29 @@ def main():
             errors.append(f"S{s}-L{l_num}: Empty transcript")
             continue
 
-        print(f"Generating S{s}-L{l_num}: {title}...")
+        jobs.append((video, transcript))
 
-        try:
-            section_title = SECTION_TITLES[s]
-            content = generate_mdx_content(api_key, transcript, title, section_title)
-            frontmatter = build_frontmatter(video)
+    print(f"Generating {len(jobs)} lectures ({MAX_WORKERS} concurrent requests)...")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(generate_lecture, api_key, video, transcript, use_cache): video
+            for video, transcript in jobs
+        }
 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "w") as f:
-                f.write(frontmatter + "\n\n" + content + "\n")
+        for future in as_completed(futures):
+            video = futures[future]
+            s = video["s"]
+            l_num = video["l"]
 
-            success += 1
-            print(f"  Done ({success})")
+            try:
+                future.result()
+                success += 1
+                print(f"  Done S{s}-L{l_num}: {video['title']} ({success}/{len(jobs)})")
 
-        except Exception as e:
-            errors.append(f"S{s}-L{l_num}: {e}")
-            print(f"  Error: {e}")
+            except Exception as e:
+                errors.append(f"S{s}-L{l_num}: {e}")
+                print(f"  Error S{s}-L{l_num}: {e}")
 
     print(f"\nDone: {success} files generated, {len(errors)} errors")
     if errors:
@@ -2,70 +2,28 @@
 
 import json
 import os
-
-# Section titles mapping
-SECTION_TITLES = {
-    1: "Introduction to the Nvidia GPUs hardware",
-    2: "Installing CUDA and other programs",
-    3: "Introduction to CUDA programming",
-    4: "Profiling",
-    5: "Performance analysis for the previous applications",
-    6: "2D Indexing",
-    7: "Shared Memory + Warp Divergence",
-    8: "Debugging tools",
-    9: "Vector Reduction",
-    10: "Roofline model",
-    11: "Matrix Multiplication (Bonus)",
-    12: "Profiling - nsight systems",
-}
-
-# Category mapping
-SECTION_CATEGORIES = {
-    1: "gpu-hardware",
-    2: "setup",
-    3: "cuda-basics",
-    4: "profiling",
-    5: "performance",
-    6: "indexing",
-    7: "memory-optimization",
-    8: "debugging",
-    9: "algorithms",
-    10: "performance",
-    11: "algorithms",
-    12: "profiling",
-}
-
-# Difficulty mapping
-SECTION_DIFFICULTY = {
-    1: "beginner",
-    2: "beginner",
-    3: "beginner",
-    4: "intermediate",
-    5: "intermediate",
-    6: "intermediate",
-    7: "advanced",
-    8: "intermediate",
-    9: "advanced",
-    10: "advanced",
-    11: "advanced",
-    12: "intermediate",
-}
-
-
-def generate_mdx(video: dict) -> str:
-    """Generate MDX content for a lecture."""
-    s = video["s"]
-    l_num = video["l"]
-    title = video["title"]
-    section_title = SECTION_TITLES[s]
-    category = SECTION_CATEGORIES[s]
-    difficulty = SECTION_DIFFICULTY[s]
-    order = s * 100 + l_num
-
-    # Generate Japanese title
-    ja_title = f"S{s}-L{l_num}: {title}"
-
-    frontmatter = f'''---
+from collections import defaultdict
+
+# Section metadata indexed by section number: (title, category, difficulty)
+SECTION_META = [
+    None,
+    ("Introduction to the Nvidia GPUs hardware", "gpu-hardware", "beginner"),
+    ("Installing CUDA and other programs", "setup", "beginner"),
+    ("Introduction to CUDA programming", "cuda-basics", "beginner"),
+    ("Profiling", "profiling", "intermediate"),
+    ("Performance analysis for the previous applications", "performance", "intermediate"),
+    ("2D Indexing", "indexing", "intermediate"),
+    ("Shared Memory + Warp Divergence", "memory-optimization", "advanced"),
+    ("Debugging tools", "debugging", "intermediate"),
+    ("Vector Reduction", "algorithms", "advanced"),
+    ("Roofline model", "performance", "advanced"),
+    ("Matrix Multiplication (Bonus)", "algorithms", "advanced"),
+    ("Profiling - nsight systems", "profiling", "intermediate"),
+]
+
+
+# Skeleton MDX template, filled per lecture with str.format
+MDX_TEMPLATE = """---
 title: "{ja_title}"
 description: "{section_title} - {title}の解説"
 sectionNumber: {s}
@@ -76,9 +34,7 @@ difficulty: "{difficulty}"
 tags: ["{category}", "cuda"]
 category: "{category}"
 order: {order}
----'''
-
-    body = f"""
+---
 
 ## 概要
 
@@ -96,27 +52,61 @@ order: {order}
 - 実践的な応用方法を学んだ
 """
 
-    return frontmatter + body
+
+def generate_mdx(video: dict) -> str:
+    """Generate MDX content for a lecture."""
+    s = video["s"]
+    l_num = video["l"]
+    title = video["title"]
+
+    section_title, category, difficulty = SECTION_META[s]
+
+    return MDX_TEMPLATE.format(
+        ja_title=f"S{s}-L{l_num}: {title}",
+        title=title,
+        s=s,
+        l_num=l_num,
+        section_title=section_title,
+        category=category,
+        difficulty=difficulty,
+        order=s * 100 + l_num,
+    )
 
 
 def main():
     with open("data/video_lectures.json") as f:
         videos = json.load(f)
 
+    # Bucket lectures by section so each directory is created once
+    by_section = defaultdict(list)
     for video in videos:
-        s = video["s"]
-        l_num = video["l"]
+        by_section[video["s"]].append(video)
+
+    written = 0
 
+    for s, section_videos in by_section.items():
         dir_path = f"src/data/sections/{s:02d}"
         os.makedirs(dir_path, exist_ok=True)
 
-        file_path = f"{dir_path}/lecture-{l_num:02d}.mdx"
-        content = generate_mdx(video)
+        for video in section_videos:
+            file_path = f"{dir_path}/lecture-{video['l']:02d}.mdx"
+            content = generate_mdx(video)
+
+            # Leave unchanged files untouched so their mtimes stay stable
+            try:
+                with open(file_path) as f:
+                    existing = f.read()
+            except FileNotFoundError:
+                existing = None
+
+            if existing == content:
+                continue
 
-        with open(file_path, "w") as f:
-            f.write(content)
+            with open(file_path, "w") as f:
+                f.write(content)
+            written += 1
 
-    print(f"Generated {len(videos)} MDX files")
+    print(f"Generated {len(videos)} MDX files ({written} written, {len(videos) - written} unchanged)")
 
 
 if __name__ == "__main__":
@@ -1,23 +1,46 @@
 """Simple HTTP server to receive transcript data from browser."""
 import json
 import os
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 SAVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'transcripts')
 os.makedirs(SAVE_DIR, exist_ok=True)
 
+# Largest POST body accepted; bigger batches should be split by the sender
+MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+
+# Shared pool for transcript file writes across request threads
+WRITE_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def save_transcript(lecture_id, text):
+    """Write one transcript with a single unbuffered write."""
+    filepath = os.path.join(SAVE_DIR, f'{lecture_id}.txt')
+    data = memoryview(text.encode('utf-8'))
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
 class Handler(BaseHTTPRequestHandler):
     def do_POST(self):
+        if 'Content-Length' not in self.headers:
+            self.send_json_error(411, 'Content-Length required')
+            return
         content_length = int(self.headers['Content-Length'])
+        if content_length > MAX_CONTENT_LENGTH:
+            self.send_json_error(413, f'Payload exceeds {MAX_CONTENT_LENGTH} bytes')
+            return
+
         body = self.rfile.read(content_length)
         data = json.loads(body)
+        # Release the raw bytes before the file writes
+        del body
         
-        saved = 0
-        for lecture_id, text in data.items():
-            filepath = os.path.join(SAVE_DIR, f'{lecture_id}.txt')
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(text)
-            saved += 1
+        saved = len(list(WRITE_POOL.map(save_transcript, data.keys(), data.values())))
         
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
@@ -26,6 +49,14 @@ class Handler(BaseHTTPRequestHandler):
         response = json.dumps({'saved': saved})
         self.wfile.write(response.encode())
     
+    def send_json_error(self, code, message):
+        """Send an error response the cross-origin browser client can read."""
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps({'error': message}).encode())
+    
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -34,7 +65,7 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
 
 if __name__ == '__main__':
-    server = HTTPServer(('127.0.0.1', 18765), Handler)
+    server = ThreadingHTTPServer(('127.0.0.1', 18765), Handler)
     print(f'Server listening on http://127.0.0.1:18765')
     print(f'Saving to: {SAVE_DIR}')
     server.serve_forever()